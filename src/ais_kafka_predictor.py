@@ -6,11 +6,11 @@ Programmatic usage::
     from shapely.geometry import Point
     import pandas as pd
 
-    from src.methods import dms_to_dd
+    from src.methods import dms_series_to_dd
 
     df_ports = pd.read_csv("data/ports/ports.csv")
-    df_ports["lat_dd"] = df_ports["latitude"].apply(dms_to_dd)
-    df_ports["lon_dd"] = df_ports["longitude"].apply(dms_to_dd)
+    df_ports["lat_dd"] = dms_series_to_dd(df_ports["latitude"])
+    df_ports["lon_dd"] = dms_series_to_dd(df_ports["longitude"])
     df_ports["geometry"] = df_ports.apply(
         lambda r: Point(r["lon_dd"], r["lat_dd"]), axis=1
     )
@@ -1,12 +1,17 @@
 import re
 
+import numpy as np
+import pandas as pd
+
+_DMS_RE = re.compile(r'[°\'"]+')
+
 
 def dms_to_dd(dms_str):
     """Convert a DMS string like 46°59'00"N to decimal degrees."""
     dms_str = dms_str.strip()
 
     # Extract components
-    parts = re.split(r'[°\'"]+', dms_str)
+    parts = _DMS_RE.split(dms_str)
     degrees = float(parts[0])
     minutes = float(parts[1])
     seconds = float(parts[2])
@@ -17,4 +22,24 @@ def dms_to_dd(dms_str):
     if direction in ('S', 'W'):
         dd *= -1
 
-    return dd
\ No newline at end of file
+    return dd
+
+
+def dms_series_to_dd(dms_series):
+    """
+    Convert a Series of DMS strings like 46°59'00"N to decimal degrees.
+
+    Batch equivalent of dms_to_dd(): one vectorised split and cast for the
+    whole column instead of a Python call per value.
+    """
+    # With no rows the expanding split has no columns to index
+    if dms_series.empty:
+        return dms_series.astype(float)
+
+    parts = dms_series.str.strip().str.split(_DMS_RE, n=3, expand=True, regex=True)
+    degrees = pd.to_numeric(parts[0])
+    minutes = pd.to_numeric(parts[1])
+    seconds = pd.to_numeric(parts[2])
+    sign = np.where(parts[3].str.strip().isin(['S', 'W']), -1.0, 1.0)
+
+    return sign * (degrees + minutes / 60 + seconds / 3600)
@@ -1,8 +1,19 @@
-from geopandas import GeoDataFrame, read_file
-from shapely.geometry import Point
+from pathlib import Path
+
+from geopandas import GeoDataFrame, points_from_xy, read_file
+from joblib import Parallel, delayed, effective_n_jobs
+from pyproj import Transformer
+from sklearn.neighbors import BallTree
 import matplotlib.pyplot as plt
 import folium
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
+import shapely
+
+EARTH_RADIUS_M = 6_371_000
+NS_PER_HOUR = 3_600_000_000_000
+
 
 class PortMatcher:
 
@@ -14,6 +25,34 @@ class PortMatcher:
         self.max_speed = max_speed_knots
         self.min_time_in_port = min_time_in_port
 
+        # Point ports reduce "within the buffer" to a great-circle radius query on
+        # the port coordinates, which a haversine BallTree answers on raw radians
+        # without reprojecting the pings. Other geometries keep the buffered
+        # point-in-polygon path. Each port goes to exactly one of the two, so a
+        # point port's radius does not depend on what else is in the table.
+        is_point = (self.ports.geom_type == 'Point').to_numpy()
+        self._port_names = self.ports['portName'].to_numpy()
+        self._point_ports = np.flatnonzero(is_point)
+        self._polygon_ports = np.flatnonzero(~is_point)
+
+        self._port_tree = None
+        self._radius_rad = self.radius_m / EARTH_RADIUS_M
+        if len(self._point_ports):
+            ports_4326 = self.ports.geometry.iloc[self._point_ports].to_crs('EPSG:4326')
+            self._port_tree = BallTree(
+                np.radians(np.column_stack([ports_4326.y.to_numpy(), ports_4326.x.to_numpy()])),
+                metric='haversine',
+            )
+
+        # Polygon buffers only depend on the constructor arguments, so project
+        # and buffer them once here instead of on every find_candidates() call.
+        self._port_polygons = (
+            self.ports.geometry.iloc[self._polygon_ports].to_crs('EPSG:3857').buffer(self.radius_m).to_numpy()
+        )
+        self._port_bounds = shapely.bounds(self._port_polygons)
+        shapely.prepare(self._port_polygons)
+        self._to_3857 = Transformer.from_crs('EPSG:4326', 'EPSG:3857', always_xy=True)
+
     def find_candidates(self, ais_df, lat_col='latitude', lon_col='longitude', timestamp_col='base_date_time'):
         """
         Return all slow-moving AIS pings that fall within a port buffer, with
@@ -34,29 +73,108 @@ class PortMatcher:
         --------
         GeoDataFrame with all original columns plus portName
         """
-        candidates = ais_df[ais_df['sog'] <= self.max_speed].copy()
-
-        if timestamp_col is not None:
-            candidates[timestamp_col] = pd.to_datetime(candidates[timestamp_col])
-
-        geometry = [Point(xy) for xy in zip(candidates[lon_col], candidates[lat_col])]
-        candidates_gdf = GeoDataFrame(candidates, geometry=geometry, crs='EPSG:4326')
+        # Boolean indexing already returns a new frame (lazily copied under
+        # copy-on-write), so no explicit .copy() is needed before assigning.
+        candidates = ais_df[ais_df['sog'] <= self.max_speed]
+
+        if timestamp_col is not None and not pd.api.types.is_datetime64_any_dtype(candidates[timestamp_col]):
+            candidates = candidates.assign(**{timestamp_col: pd.to_datetime(candidates[timestamp_col])})
+
+        lons = candidates[lon_col].to_numpy(dtype=float)
+        lats = candidates[lat_col].to_numpy(dtype=float)
+
+        point_parts, port_parts = [], []
+        if self._port_tree is not None:
+            point_idx, port_idx = self._query_port_tree(lats, lons)
+            point_parts.append(point_idx)
+            port_parts.append(self._point_ports[port_idx])
+        if len(self._polygon_ports):
+            xs, ys = self._to_3857.transform(lons, lats)
+            point_idx, port_idx = self._query_port_polygons(xs, ys)
+            point_parts.append(point_idx)
+            port_parts.append(self._polygon_ports[port_idx])
+
+        if point_parts:
+            point_idx, port_idx = np.concatenate(point_parts), np.concatenate(port_parts)
+        else:
+            point_idx = port_idx = np.empty(0, dtype=np.intp)
+
+        matched = candidates.iloc[point_idx].assign(portName=self._port_names[port_idx])
+        return GeoDataFrame(
+            matched, geometry=points_from_xy(lons[point_idx], lats[point_idx]), crs='EPSG:4326'
+        )
 
-        ports_buffered = self.ports.copy()
-        if ports_buffered.crs != candidates_gdf.crs:
-            ports_buffered = ports_buffered.to_crs(candidates_gdf.crs)
+    def _query_port_tree(self, lats, lons):
+        """
+        Return (point_idx, port_idx) pairs for every point within radius_m
+        (great-circle) of a point port. A point near several ports yields one
+        pair per port; points with a NaN coordinate match nothing.
+        """
+        # Pings without a position cannot be in any port; the tree rejects
+        # NaN input, so only finite points are queried.
+        finite = np.flatnonzero(np.isfinite(lats) & np.isfinite(lons))
+        latlon = np.radians(np.column_stack([lats[finite], lons[finite]]))
+        if len(latlon) == 0:
+            return finite, finite
+
+        # Cheap nearest-port pass first so the radius query only sees points
+        # that have at least one port in range.
+        dist, _ = self._port_tree.query(latlon, k=1)
+        near = np.flatnonzero(dist[:, 0] <= self._radius_rad)
+        if near.size == 0:
+            return near, near
+
+        hits = self._port_tree.query_radius(latlon[near], r=self._radius_rad)
+        lens = np.fromiter(map(len, hits), dtype=np.intp, count=len(hits))
+        return np.repeat(finite[near], lens), np.concatenate(hits).astype(np.intp)
+
+    def _query_port_polygons(self, xs, ys):
+        """
+        Return (point_idx, port_idx) pairs for every EPSG:3857 point inside a
+        buffered port polygon.
 
-        ports_buffered = ports_buffered.to_crs('EPSG:3857')
-        candidates_gdf = candidates_gdf.to_crs('EPSG:3857')
-        ports_buffered['geometry'] = ports_buffered.geometry.buffer(self.radius_m)
+        Points are sorted by x once so each port only tests the slab of points
+        within its bounding box (two binary searches plus a y mask); the
+        survivors go through shapely.contains_xy against the prepared polygon,
+        with no point geometries created.
+        """
+        order = np.argsort(xs, kind='stable')
+        xs_sorted = xs[order]
+
+        point_parts, port_parts = [], []
+        for port, (min_x, min_y, max_x, max_y) in enumerate(self._port_bounds):
+            lo = np.searchsorted(xs_sorted, min_x, side='left')
+            hi = np.searchsorted(xs_sorted, max_x, side='right')
+            slab = order[lo:hi]
+            slab = slab[(ys[slab] >= min_y) & (ys[slab] <= max_y)]
+            hits = slab[shapely.contains_xy(self._port_polygons[port], xs[slab], ys[slab])]
+            point_parts.append(hits)
+            port_parts.append(np.full(len(hits), port, dtype=np.intp))
+
+        return np.concatenate(point_parts), np.concatenate(port_parts)
+
+    def _find_candidates(self, ais_df, n_jobs, **kwargs):
+        """
+        find_candidates(), optionally spread over n_jobs threads.
 
-        return candidates_gdf.sjoin(
-            ports_buffered[['portName', 'geometry']],
-            predicate='within'
+        Pings are matched independently of each other, so the frame is cut into
+        contiguous row chunks and the results concatenated. Visits are split
+        afterwards on the combined result, so chunk boundaries cannot split a
+        stay. The port tree is shared read-only between the threads.
+        """
+        n_chunks = min(effective_n_jobs(n_jobs), len(ais_df))
+        if n_chunks <= 1:
+            return self.find_candidates(ais_df, **kwargs)
+
+        bounds = np.linspace(0, len(ais_df), n_chunks + 1).astype(int)
+        results = Parallel(n_jobs=n_chunks, prefer='threads')(
+            delayed(self.find_candidates)(ais_df.iloc[start:stop], **kwargs)
+            for start, stop in zip(bounds[:-1], bounds[1:])
         )
+        return pd.concat(results)
 
     def find_port_visits(self, ais_df, gap_threshold_h=24,
-                         lat_col='latitude', lon_col='longitude', timestamp_col='base_date_time'):
+                         lat_col='latitude', lon_col='longitude', timestamp_col='base_date_time', n_jobs=1):
         """
         Return a DataFrame of individual port visits derived from AIS data.
 
@@ -78,50 +196,67 @@ class PortMatcher:
             Name of longitude column (default: 'longitude')
         timestamp_col : str
             Name of timestamp column (default: 'base_date_time')
+        n_jobs : int
+            Number of threads for the spatial matching step; -1 uses all cores (default: 1).
 
         Returns:
         --------
         DataFrame with columns: mmsi, portName, entry_time, exit_time, duration_hours
         """
-        candidates = self.find_candidates(ais_df, lat_col=lat_col, lon_col=lon_col, timestamp_col=timestamp_col)
+        candidates = self._find_candidates(
+            ais_df, n_jobs, lat_col=lat_col, lon_col=lon_col, timestamp_col=timestamp_col
+        )
+        # Pings without a timestamp cannot be placed in a visit.
+        candidates = candidates[candidates[timestamp_col].notna()]
 
         if candidates.empty:
             return pd.DataFrame(columns=['mmsi', 'portName', 'entry_time', 'exit_time', 'duration_hours'])
 
-        candidates = candidates.sort_values(['mmsi', 'portName', timestamp_col])
-
-        gap_hours = (
-            candidates.groupby(['mmsi', 'portName'])[timestamp_col]
-            .diff()
-            .dt.total_seconds()
-            .div(3600)
-        )
+        return self._split_visits(candidates, gap_threshold_h, timestamp_col)
 
-        # New visit when the (mmsi, portName) group changes or the gap exceeds the threshold
-        group_change = (
-            candidates[['mmsi', 'portName']]
-            .ne(candidates[['mmsi', 'portName']].shift())
-            .any(axis=1)
-        )
-        candidates['_visit_id'] = (group_change | (gap_hours > gap_threshold_h)).cumsum()
-
-        visits = (
-            candidates.groupby('_visit_id', sort=False)
-            .agg(
-                mmsi=('mmsi', 'first'),
-                portName=('portName', 'first'),
-                entry_time=(timestamp_col, 'min'),
-                exit_time=(timestamp_col, 'max'),
-            )
-            .reset_index(drop=True)
-        )
-        visits['duration_hours'] = (
-            (visits['exit_time'] - visits['entry_time']).dt.total_seconds() / 3600
+    @staticmethod
+    def _split_visits(candidates, gap_threshold_h, timestamp_col):
+        """
+        Collapse matched pings into one row per contiguous (mmsi, portName) stay.
+
+        Runs as a single sweep over NumPy arrays: mmsi and portName are
+        factorized to integer codes and timestamps viewed as int64 nanoseconds,
+        the rows are sorted once, and every row that starts a new visit (key
+        change or gap above the threshold) is flagged. Since the rows are time
+        ordered within a visit, entry and exit are simply its first and last row,
+        taken from the timestamp column itself so they keep its dtype.
+        """
+        mmsi_codes, mmsi_values = pd.factorize(candidates['mmsi'], sort=True)
+        port_codes, port_values = pd.factorize(candidates['portName'], sort=True)
+        ts = candidates[timestamp_col]
+        ts_ns = ts.to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+        order = np.lexsort((ts_ns, port_codes, mmsi_codes))
+        mmsi_codes, port_codes, ts_ns = mmsi_codes[order], port_codes[order], ts_ns[order]
+        ts = ts.iloc[order].reset_index(drop=True)
+
+        new_visit = np.ones(len(ts_ns), dtype=bool)
+        new_visit[1:] = (
+            (mmsi_codes[1:] != mmsi_codes[:-1])
+            | (port_codes[1:] != port_codes[:-1])
+            | (np.diff(ts_ns) > gap_threshold_h * NS_PER_HOUR)
         )
+        starts = np.flatnonzero(new_visit)
+        ends = np.append(starts[1:], len(ts_ns)) - 1
+        entry_ns, exit_ns = ts_ns[starts], ts_ns[ends]
+
+        visits = pd.DataFrame({
+            'mmsi': mmsi_values.take(mmsi_codes[starts]),
+            'portName': port_values.take(port_codes[starts]),
+            'entry_time': ts.iloc[starts].reset_index(drop=True),
+            'exit_time': ts.iloc[ends].reset_index(drop=True),
+            'duration_hours': (exit_ns - entry_ns) / NS_PER_HOUR,
+        })
 
         return visits.sort_values(['mmsi', 'entry_time']).reset_index(drop=True)
 
-    def match(self, ais_df, gap_threshold_h=24, lat_col='latitude', lon_col='longitude', timestamp_col='base_date_time'):
+    def match(self, ais_df, gap_threshold_h=24, lat_col='latitude', lon_col='longitude', timestamp_col='base_date_time',
+              n_jobs=1):
         """
         Return unique (mmsi, portName) pairs for vessels that spent at least
         min_time_in_port hours at a port.
@@ -130,6 +265,10 @@ class PortMatcher:
         same vessel at the same port months apart are not merged into a single
         artificially long stay.
 
+        With min_time_in_port <= 0 every visit qualifies, so the duration
+        filter (and the visit splitting behind it) is skipped and the pairs are
+        taken straight from find_candidates().
+
         Parameters:
         -----------
         ais_df : pandas.DataFrame
@@ -142,29 +281,197 @@ class PortMatcher:
             Name of longitude column (default: 'longitude')
         timestamp_col : str
             Name of timestamp column (default: 'base_date_time')
+        n_jobs : int
+            Number of threads for the spatial matching step; -1 uses all cores (default: 1).
+        """
+        candidates = self._find_candidates(
+            ais_df, n_jobs, lat_col=lat_col, lon_col=lon_col, timestamp_col=timestamp_col
+        )
+        return self._match_candidates(candidates, gap_threshold_h, timestamp_col)
+
+    def match_iter(self, chunks, gap_threshold_h=24, lat_col='latitude', lon_col='longitude',
+                   timestamp_col='base_date_time', chunksize=1_000_000):
+        """
+        Same result as match(), for AIS data streamed in chunks that do not fit
+        in memory together.
+
+        Each chunk is reduced to its matched (mmsi, portName, timestamp) pings
+        straight away, so only chunksize raw rows plus the matched pings are held
+        at once. Visits are split on the combined matched pings after the last
+        chunk, so a stay that straddles two chunks is still one visit.
+
+        Parameters:
+        -----------
+        chunks : iterable of pandas.DataFrame, or str / Path
+            AIS chunks, e.g. pd.read_csv(..., chunksize=...). A path is read in
+            chunksize batches: Parquet files via pyarrow, anything else as CSV.
+        gap_threshold_h : float
+            Hour gap that splits a continuous stay into separate visits (default: 24).
+        lat_col : str
+            Name of latitude column (default: 'latitude')
+        lon_col : str
+            Name of longitude column (default: 'longitude')
+        timestamp_col : str
+            Name of timestamp column (default: 'base_date_time')
+        chunksize : int
+            Rows per chunk when chunks is a path (default: 1,000,000).
         """
-        visits = self.find_port_visits(
+        if isinstance(chunks, (str, Path)):
+            chunks = self._read_chunks(Path(chunks), chunksize)
+
+        partials = [
+            self.find_candidates(chunk, lat_col=lat_col, lon_col=lon_col, timestamp_col=timestamp_col)
+            [['mmsi', 'portName', timestamp_col]]
+            for chunk in chunks
+        ]
+        if not partials:
+            return pd.DataFrame(columns=['mmsi', 'portName'])
+
+        return self._match_candidates(pd.concat(partials, ignore_index=True), gap_threshold_h, timestamp_col)
+
+    @staticmethod
+    def _read_chunks(path, chunksize):
+        """Yield DataFrames of at most chunksize rows from a Parquet or CSV file."""
+        if path.suffix == '.parquet':
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+                yield batch.to_pandas(types_mapper=pd.ArrowDtype)
+        else:
+            yield from pd.read_csv(path, chunksize=chunksize)
+
+    def _match_candidates(self, candidates, gap_threshold_h, timestamp_col):
+        """Reduce find_candidates() output to the (mmsi, portName) pairs match() returns."""
+        candidates = candidates[candidates[timestamp_col].notna()]
+        if candidates.empty:
+            return pd.DataFrame(columns=['mmsi', 'portName'])
+
+        if self.min_time_in_port <= 0:
+            # Same pair order as the visit path, which is sorted by (mmsi, entry_time).
+            return self._unique_pairs(candidates.sort_values(['mmsi', timestamp_col], kind='stable'))
+
+        visits = self._split_visits(candidates, gap_threshold_h, timestamp_col)
+        return self._unique_pairs(visits[visits['duration_hours'] >= self.min_time_in_port])
+
+    @staticmethod
+    def _unique_pairs(df):
+        """
+        Return the distinct (mmsi, portName) rows of df in order of first
+        appearance.
+
+        Both columns are factorized and combined into one int64 key, so the
+        dedup hashes a single integer per row instead of an (int, str) pair.
+        Rows with a missing mmsi or portName are dropped.
+        """
+        mmsi_codes, mmsi_values = pd.factorize(df['mmsi'])
+        port_codes, port_values = pd.factorize(df['portName'])
+        valid = (mmsi_codes >= 0) & (port_codes >= 0)
+        n_ports = max(len(port_values), 1)
+        keys = pd.unique(mmsi_codes[valid].astype(np.int64) * n_ports + port_codes[valid])
+
+        return pd.DataFrame({
+            'mmsi': mmsi_values.take(keys // n_ports),
+            'portName': port_values.take(keys % n_ports),
+        })
+
+    def match_parquet(self, path, gap_threshold_h=24, lat_col='latitude', lon_col='longitude',
+                      timestamp_col='base_date_time', n_jobs=1):
+        """
+        Run match() on an AIS Parquet file, reading only the row groups that can
+        contain a port match.
+
+        Each row group's min/max statistics for lon_col/lat_col are compared with
+        the bounding box of all port search areas; row groups entirely outside
+        it are skipped without being read. The surviving row groups are handed
+        to pandas as Arrow-backed columns.
+
+        Parameters:
+        -----------
+        path : str or Path
+            Parquet file with AIS data
+        gap_threshold_h : float
+            Hour gap that splits a continuous stay into separate visits (default: 24).
+        lat_col : str
+            Name of latitude column (default: 'latitude')
+        lon_col : str
+            Name of longitude column (default: 'longitude')
+        timestamp_col : str
+            Name of timestamp column (default: 'base_date_time')
+        n_jobs : int
+            Number of threads for the spatial matching step; -1 uses all cores (default: 1).
+        """
+        parquet_file = pq.ParquetFile(path)
+        min_lon, min_lat, max_lon, max_lat = self._search_bounds()
+
+        row_groups = []
+        for i in range(parquet_file.metadata.num_row_groups):
+            stats = self._row_group_bounds(parquet_file.metadata.row_group(i), (lon_col, lat_col))
+            lon_stats, lat_stats = stats[lon_col], stats[lat_col]
+            if lon_stats is not None and (lon_stats[1] < min_lon or lon_stats[0] > max_lon):
+                continue
+            if lat_stats is not None and (lat_stats[1] < min_lat or lat_stats[0] > max_lat):
+                continue
+            row_groups.append(i)
+
+        ais_df = parquet_file.read_row_groups(row_groups).to_pandas(types_mapper=pd.ArrowDtype)
+        return self.match(
             ais_df,
             gap_threshold_h=gap_threshold_h,
             lat_col=lat_col,
             lon_col=lon_col,
             timestamp_col=timestamp_col,
+            n_jobs=n_jobs,
         )
 
-        if visits.empty:
-            return pd.DataFrame(columns=['mmsi', 'portName'])
-
-        filtered = visits[visits['duration_hours'] >= self.min_time_in_port]
-        return filtered[['mmsi', 'portName']].drop_duplicates().reset_index(drop=True)
+    def _search_bounds(self):
+        """
+        Return (min_lon, min_lat, max_lon, max_lat) in EPSG:4326 enclosing every
+        area a ping can be matched in.
+        """
+        boxes = []
+        if len(self._polygon_ports):
+            polygons = GeoDataFrame(geometry=self._port_polygons, crs='EPSG:3857')
+            boxes.append(polygons.to_crs('EPSG:4326').total_bounds)
+
+        if len(self._point_ports):
+            # Point ports match on a great-circle radius: pad the port bounds by
+            # the radius in latitude, and in longitude by the radius widened for
+            # the highest latitude it can reach.
+            min_lon, min_lat, max_lon, max_lat = (
+                self.ports.geometry.iloc[self._point_ports].to_crs('EPSG:4326').total_bounds
+            )
+            pad_lat = np.degrees(self._radius_rad)
+            max_abs_lat = min(max(abs(min_lat), abs(max_lat)) + pad_lat, 89.0)
+            pad_lon = pad_lat / np.cos(np.radians(max_abs_lat))
+            boxes.append((min_lon - pad_lon, min_lat - pad_lat, max_lon + pad_lon, max_lat + pad_lat))
+
+        if not boxes:
+            return np.inf, np.inf, -np.inf, -np.inf
+        boxes = np.asarray(boxes)
+        return (*boxes[:, :2].min(axis=0), *boxes[:, 2:].max(axis=0))
+
+    @staticmethod
+    def _row_group_bounds(row_group, columns):
+        """Return {column: (min, max) or None} from a Parquet row group's statistics."""
+        bounds = dict.fromkeys(columns)
+        for j in range(row_group.num_columns):
+            column = row_group.column(j)
+            stats = column.statistics
+            if column.path_in_schema in bounds and stats is not None and stats.has_min_max:
+                bounds[column.path_in_schema] = (stats.min, stats.max)
+        return bounds
 
     def add_port_call_counts(self, matched_df):
         """
         Takes the output of match() and adds a 'port_call_count' column
         to self.ports based on the number of unique vessels visiting each port.
         """
-        # count unique MMSI per port
-        port_call_counts = matched_df.groupby('portName')['mmsi'].nunique().reset_index()
-        port_call_counts.columns = ['portName', 'port_call_count']
+        # count unique MMSI per port: one dedup of the (mmsi, portName) pairs,
+        # then a plain size() instead of a per-group nunique()
+        port_call_counts = (
+            self._unique_pairs(matched_df)
+            .groupby('portName', sort=False)
+            .size()
+            .reset_index(name='port_call_count')
+        )
 
         # merge with ports GeoDataFrame
         self.ports = self.ports.merge(port_call_counts, on='portName', how='left')
@@ -172,6 +479,13 @@ class PortMatcher:
 
         return self.ports
 
+    @classmethod
+    def _get_usa(cls):
+        """Download and parse the US states shapefile once per process."""
+        if '_usa_cache' not in cls.__dict__:
+            cls._usa_cache = read_file(cls.us_filepath)
+        return cls._usa_cache
+
     def visualize_port_calls(self):
         """
         Visualize the ports with a color scale based on port_call_count.
@@ -181,7 +495,7 @@ class PortMatcher:
         fig, ax = plt.subplots(figsize=(16, 10))
 
         # Plot US map
-        usa = read_file(self.us_filepath)
+        usa = self._get_usa()
         usa.plot(ax=ax, color='lightgray', edgecolor='black')
 
         self.ports.plot(
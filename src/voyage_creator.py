@@ -1,7 +1,13 @@
 import numpy as np
 import pandas as pd
 
-from src.port_matcher import PortMatcher
+from src.port_matcher import NS_PER_HOUR, PortMatcher
+
+_VOYAGE_COLUMNS = [
+    'voyage_id', 'mmsi', 'departure_port', 'departure_time',
+    'arrival_port', 'arrival_time', 'duration_hours', 'ping_count',
+]
+_VOYAGE_TIME_COLUMNS = ('departure_time', 'arrival_time')
 
 
 class VoyageCreator:
@@ -77,40 +83,42 @@ class VoyageCreator:
 
         Returns
         -------
-        DataFrame — copy of ais_df with four new columns.
+        DataFrame — new frame with ais_df's columns plus four new ones; ais_df is not modified.
         """
-        df = ais_df.copy()
-        df[timestamp_col] = pd.to_datetime(df[timestamp_col])
+        # Parse timestamps only when needed; sort_values() below already returns
+        # a new frame, so ais_df itself is never modified and needs no copy.
+        if not pd.api.types.is_datetime64_any_dtype(ais_df[timestamp_col]):
+            ais_df = ais_df.assign(**{timestamp_col: pd.to_datetime(ais_df[timestamp_col])})
 
         # Sort globally by timestamp (required by merge_asof's monotone 'on' column).
-        pings_sorted    = df.sort_values(timestamp_col).reset_index(drop=True)
+        pings_sorted    = ais_df.sort_values(timestamp_col).reset_index(drop=True)
+        ping_keys       = pings_sorted[['mmsi', timestamp_col]]
         visits_by_entry = port_visits[['mmsi', 'portName', 'entry_time', 'exit_time']].sort_values('entry_time')
         visits_by_exit  = port_visits[['mmsi', 'portName', 'exit_time']].sort_values('exit_time')
 
         # --- current_port ---
         # Replace the O(N×M) cartesian merge+filter with an O(N log N) merge_asof.
         # Find each ping's most-recent visit whose entry_time ≤ ping timestamp, then
-        # confirm the ping also falls within that visit's exit_time window.
+        # confirm the ping also falls within that visit's exit_time window
+        # (pings with no earlier visit have a NaT exit_time and compare False).
         current = pd.merge_asof(
-            pings_sorted[['mmsi', timestamp_col]],
+            ping_keys,
             visits_by_entry.rename(columns={'portName': 'current_port'}),
             by='mmsi', left_on=timestamp_col, right_on='entry_time', direction='backward',
         )
-        in_visit_mask = (
-            current['exit_time'].notna().values
-            & (pings_sorted[timestamp_col].values <= current['exit_time'].values)
+        pings_sorted['current_port'] = current['current_port'].where(
+            ping_keys[timestamp_col] <= current['exit_time']
         )
-        pings_sorted['current_port'] = current['current_port'].where(in_visit_mask)
 
         # --- origin_port / destination_port ---
         origin = pd.merge_asof(
-            pings_sorted[['mmsi', timestamp_col]],
+            ping_keys,
             visits_by_exit.rename(columns={'portName': 'origin_port'}),
             by='mmsi', left_on=timestamp_col, right_on='exit_time', direction='backward',
         )['origin_port']
 
         destination = pd.merge_asof(
-            pings_sorted[['mmsi', timestamp_col]],
+            ping_keys,
             visits_by_entry[['mmsi', 'portName', 'entry_time']].rename(columns={'portName': 'destination_port'}),
             by='mmsi', left_on=timestamp_col, right_on='entry_time', direction='forward',
         )['destination_port']
@@ -138,7 +146,7 @@ class VoyageCreator:
         Parameters
         ----------
         df_labeled : DataFrame
-            Output of label_pings() — modified in-place to fill voyage_id.
+            Output of label_pings(); not modified.
         port_visits : DataFrame
             Output of find_port_visits().
         timestamp_col : str
@@ -147,56 +155,63 @@ class VoyageCreator:
         Returns
         -------
         tuple(df_labeled, df_voyages)
-            df_labeled  : input DataFrame with voyage_id filled for sea pings.
+            df_labeled  : copy of the input, sorted by (mmsi, timestamp_col), with voyage_id filled for sea pings.
             df_voyages  : one row per voyage with departure/arrival metadata.
         """
-        voyage_records    = []
-        voyage_id_counter = 0
+        voyage_parts   = {col: [] for col in _VOYAGE_COLUMNS}
+        next_voyage_id = 0
 
         # Sort once so each vessel's pings form a contiguous, time-ordered block.
-        # This lets us locate per-vessel slices and voyage windows with binary search
-        # instead of scanning the full DataFrame for every voyage (O(V·N) → O(N + V log N)).
+        # Voyage windows are then located with binary search on the vessel's
+        # timestamps instead of scanning the full DataFrame for every voyage.
+        # All time arithmetic runs on int64 nanoseconds.
         df_labeled = df_labeled.sort_values(['mmsi', timestamp_col]).reset_index(drop=True)
 
-        mmsi_arr      = df_labeled['mmsi'].values
-        ts_arr        = df_labeled[timestamp_col].values
-        voyage_id_col = df_labeled.columns.get_loc('voyage_id')
+        ts_ns       = df_labeled[timestamp_col].to_numpy(dtype='datetime64[ns]').view(np.int64)
+        voyage_ids  = df_labeled['voyage_id'].to_numpy(dtype=object, copy=True)
+        vessel_rows = df_labeled.groupby('mmsi', sort=False).indices
+        no_rows     = np.empty(0, dtype=np.intp)
 
         for mmsi, visits in port_visits.groupby('mmsi'):
-            # Find this vessel's contiguous row range via binary search on the sorted mmsi array.
-            v_start   = int(np.searchsorted(mmsi_arr, mmsi, side='left'))
-            v_end     = int(np.searchsorted(mmsi_arr, mmsi, side='right'))
-            vessel_ts = ts_arr[v_start:v_end]
-
-            visits_sorted = visits.sort_values('entry_time').reset_index(drop=True)
-
-            for i in range(len(visits_sorted) - 1):
-                dep = visits_sorted.iloc[i]
-                arr = visits_sorted.iloc[i + 1]
-
-                # Skip overlapping port buffers
-                if arr['entry_time'] <= dep['exit_time']:
-                    continue
-
-                # Binary search for the sea-ping window: dep.exit_time < ts < arr.entry_time
-                lo = int(np.searchsorted(vessel_ts, dep['exit_time'], side='right'))
-                hi = int(np.searchsorted(vessel_ts, arr['entry_time'], side='left'))
-                ping_count = hi - lo
-
-                if ping_count > 0:
-                    df_labeled.iloc[v_start + lo : v_start + hi, voyage_id_col] = voyage_id_counter
-
-                voyage_records.append({
-                    'voyage_id':      voyage_id_counter,
-                    'mmsi':           mmsi,
-                    'departure_port': dep['portName'],
-                    'departure_time': dep['exit_time'],
-                    'arrival_port':   arr['portName'],
-                    'arrival_time':   arr['entry_time'],
-                    'duration_hours': (arr['entry_time'] - dep['exit_time']).total_seconds() / 3600,
-                    'ping_count':     ping_count,
-                })
-                voyage_id_counter += 1
-
-        df_voyages = pd.DataFrame(voyage_records)
+            rows      = vessel_rows.get(mmsi, no_rows)
+            vessel_ts = ts_ns[rows]
+
+            visits_sorted = visits.sort_values('entry_time')
+            port_names    = visits_sorted['portName'].to_numpy()
+            entry_ns      = visits_sorted['entry_time'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+            exit_ns       = visits_sorted['exit_time'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+            # Voyage runs from visit i's exit to visit i+1's entry; skip overlapping port buffers
+            dep = np.flatnonzero(entry_ns[1:] > exit_ns[:-1])
+            arr = dep + 1
+
+            # Binary search for the sea-ping windows: dep.exit_time < ts < arr.entry_time
+            lo  = np.searchsorted(vessel_ts, exit_ns[dep], side='right')
+            hi  = np.searchsorted(vessel_ts, entry_ns[arr], side='left')
+            ids = np.arange(next_voyage_id, next_voyage_id + len(dep))
+
+            for voyage_id, start, stop in zip(ids, lo, hi):
+                voyage_ids[rows[start:stop]] = voyage_id
+
+            voyage_parts['voyage_id'].append(ids)
+            voyage_parts['mmsi'].append(np.full(len(dep), mmsi))
+            voyage_parts['departure_port'].append(port_names[dep])
+            voyage_parts['departure_time'].append(visits_sorted['exit_time'].iloc[dep])
+            voyage_parts['arrival_port'].append(port_names[arr])
+            voyage_parts['arrival_time'].append(visits_sorted['entry_time'].iloc[arr])
+            voyage_parts['duration_hours'].append((entry_ns[arr] - exit_ns[dep]) / NS_PER_HOUR)
+            voyage_parts['ping_count'].append(hi - lo)
+            next_voyage_id += len(dep)
+
+        df_labeled['voyage_id'] = voyage_ids
+
+        if next_voyage_id == 0:
+            return df_labeled, pd.DataFrame(columns=_VOYAGE_COLUMNS)
+
+        # Departure/arrival times are collected as Series so they keep the visit
+        # columns' dtype (resolution, timezone); everything else is plain arrays.
+        df_voyages = pd.DataFrame({
+            col: pd.concat(parts, ignore_index=True) if col in _VOYAGE_TIME_COLUMNS else np.concatenate(parts)
+            for col, parts in voyage_parts.items()
+        })
         return df_labeled, df_voyages
@@ -0,0 +1,88 @@
+"""Shared fixtures for the test suite."""
+import pytest
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import Point
+
+BASE_TIME = pd.Timestamp("2025-01-01 00:00:00")
+
+
+@pytest.fixture(scope="session")
+def base_time():
+    """Start time shared by every generated AIS track."""
+    return BASE_TIME
+
+
+@pytest.fixture(scope="session")
+def ports_gdf():
+    """Two ports: one near New York, one near Los Angeles."""
+    return gpd.GeoDataFrame(
+        {
+            "portName": ["NewYorkPort", "LosAngelesPort"],
+            "geometry": [Point(-74.0, 40.7), Point(-118.2, 33.7)],
+        },
+        crs="EPSG:4326",
+    )
+
+
+@pytest.fixture(scope="session")
+def ais_factory():
+    """Factory: n_hours hourly AIS pings for one vessel at a fixed position."""
+    def make(mmsi, lon, lat, sog, start_time=BASE_TIME, n_hours=3):
+        return pd.DataFrame({
+            "mmsi": np.full(n_hours, mmsi, dtype=np.int64),
+            "longitude": np.full(n_hours, lon, dtype=np.float64),
+            "latitude": np.full(n_hours, lat, dtype=np.float64),
+            "sog": np.full(n_hours, sog, dtype=np.float64),
+            "base_date_time": pd.date_range(start_time, periods=n_hours, freq="h"),
+        }, copy=False)
+    return make
+
+
+@pytest.fixture(scope="session")
+def two_vessel_ais():
+    """Vessel 100 moored at NewYorkPort and vessel 200 at LosAngelesPort, 3 hourly pings each."""
+    timestamps = pd.date_range(BASE_TIME, periods=3, freq="h")
+    return pd.DataFrame({
+        "mmsi": [100] * 3 + [200] * 3,
+        "longitude": [-74.0] * 3 + [-118.2] * 3,
+        "latitude": [40.7] * 3 + [33.7] * 3,
+        "sog": 0.5,
+        "base_date_time": timestamps.append(timestamps),
+    })
+
+
+@pytest.fixture(scope="session")
+def gap_ais():
+    """Factory: vessel 111 at NewYorkPort for two 3-ping blocks, the second starting hours_offset later."""
+    def make(hours_offset):
+        hours = [0, 1, 2] + [hours_offset + h for h in (0, 1, 2)]
+        return pd.DataFrame({
+            "mmsi": 111,
+            "longitude": -74.0,
+            "latitude": 40.7,
+            "sog": 0.5,
+            "base_date_time": BASE_TIME + pd.to_timedelta(hours, "h"),
+        })
+    return make
+
+
+# Pings that must never produce a port visit, shared by the exclusion tests.
+
+@pytest.fixture(scope="session")
+def fast_ais(ais_factory):
+    """Vessel 222 at NewYorkPort with sog=5.0, above max_speed_knots=1.5."""
+    return ais_factory(mmsi=222, lon=-74.0, lat=40.7, sog=5.0)
+
+
+@pytest.fixture(scope="session")
+def outside_radius_ais(ais_factory):
+    """Vessel 333 moored ~170 km west of NewYorkPort, well outside a 10 nm radius."""
+    return ais_factory(mmsi=333, lon=-76.0, lat=40.7, sog=0.5)
+
+
+@pytest.fixture(scope="session")
+def empty_ais():
+    """Untyped empty AIS frame, as built from a bare column list."""
+    return pd.DataFrame(columns=["mmsi", "longitude", "latitude", "sog", "base_date_time"])
@@ -0,0 +1,34 @@
+"""Tests for coordinate conversion helpers."""
+import pytest
+import pandas as pd
+
+from src.methods import dms_series_to_dd, dms_to_dd
+
+
+class TestDmsToDd:
+    def test_north_is_positive(self):
+        assert dms_to_dd("46°59'00\"N") == pytest.approx(46 + 59 / 60)
+
+    def test_west_is_negative(self):
+        assert dms_to_dd("123°49'30\"W") == pytest.approx(-(123 + 49 / 60 + 30 / 3600))
+
+
+class TestDmsSeriesToDd:
+    def test_matches_scalar_conversion(self):
+        dms = pd.Series(["46°59'00\"N", "123°49'30\"W", " 22°00'00\"S ", "159°20'00\"E"])
+        result = dms_series_to_dd(dms)
+        expected = dms.apply(dms_to_dd)
+        assert result.tolist() == pytest.approx(expected.tolist())
+
+    def test_preserves_index(self):
+        dms = pd.Series(["46°59'00\"N", "123°49'00\"W"], index=[10, 20])
+        assert list(dms_series_to_dd(dms).index) == [10, 20]
+
+    def test_empty_series_returns_empty(self):
+        result = dms_series_to_dd(pd.Series([], dtype=object))
+        assert result.empty
+        assert result.dtype == float
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -2,56 +2,29 @@
 import pytest
 import pandas as pd
 import geopandas as gpd
-from datetime import datetime, timedelta
+import pyarrow.parquet as pq
+from datetime import timedelta
 from shapely.geometry import Point
 
 from src.port_matcher import PortMatcher
 
-BASE_TIME = datetime(2025, 1, 1, 0, 0, 0)
-
 
 # ---------------------------------------------------------------------------
 # Fixtures
 # ---------------------------------------------------------------------------
 
-@pytest.fixture
-def ports_gdf():
-    """Two ports: one near New York, one near Los Angeles."""
-    return gpd.GeoDataFrame(
-        {
-            "portName": ["NewYorkPort", "LosAngelesPort"],
-            "geometry": [Point(-74.0, 40.7), Point(-118.2, 33.7)],
-        },
-        crs="EPSG:4326",
-    )
-
-
-@pytest.fixture
+@pytest.fixture(scope="module")
 def matcher(ports_gdf):
     return PortMatcher(ports_gdf, radius_nm=10, max_speed_knots=1.5, min_time_in_port=1)
 
 
-def _ais_df(mmsi, lon, lat, sog, n_hours=3):
-    """Create an AIS DataFrame with n_hours hourly records at the given position."""
-    timestamps = [BASE_TIME + timedelta(hours=i) for i in range(n_hours)]
-    return pd.DataFrame(
-        {
-            "mmsi": mmsi,
-            "longitude": lon,
-            "latitude": lat,
-            "sog": sog,
-            "base_date_time": timestamps,
-        }
-    )
-
-
 # ---------------------------------------------------------------------------
 # match()
 # ---------------------------------------------------------------------------
 
 class TestMatch:
-    def test_vessel_at_port_is_matched(self, matcher):
-        ais = _ais_df(mmsi=111, lon=-74.0, lat=40.7, sog=0.5)
+    def test_vessel_at_port_is_matched(self, matcher, ais_factory):
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5)
         result = matcher.match(ais)
 
         assert list(result.columns) == ["mmsi", "portName"]
@@ -59,41 +32,50 @@ class TestMatch:
         assert result.iloc[0]["mmsi"] == 111
         assert result.iloc[0]["portName"] == "NewYorkPort"
 
-    def test_fast_vessel_is_excluded(self, matcher):
-        # sog=5.0 exceeds max_speed_knots=1.5
-        ais = _ais_df(mmsi=222, lon=-74.0, lat=40.7, sog=5.0)
-        assert len(matcher.match(ais)) == 0
-
-    def test_vessel_outside_radius_is_excluded(self, matcher):
-        # ~170 km west of NewYorkPort — well outside 10 nm radius
-        ais = _ais_df(mmsi=333, lon=-76.0, lat=40.7, sog=0.5)
-        assert len(matcher.match(ais)) == 0
-
-    def test_short_stay_is_excluded(self, ports_gdf):
+    def test_short_stay_is_excluded(self, ports_gdf, ais_factory):
         matcher = PortMatcher(ports_gdf, radius_nm=10, max_speed_knots=1.5, min_time_in_port=5)
         # 2 records 1 hour apart → duration = 1 h < min_time_in_port = 5 h
-        ais = _ais_df(mmsi=444, lon=-74.0, lat=40.7, sog=0.5, n_hours=2)
+        ais = ais_factory(mmsi=444, lon=-74.0, lat=40.7, sog=0.5, n_hours=2)
         assert len(matcher.match(ais)) == 0
 
-    def test_result_is_deduplicated(self, matcher):
-        ais = _ais_df(mmsi=555, lon=-74.0, lat=40.7, sog=0.5, n_hours=10)
+    def test_zero_min_time_matches_single_ping(self, ports_gdf, ais_factory):
+        matcher = PortMatcher(ports_gdf, radius_nm=10, max_speed_knots=1.5, min_time_in_port=0)
+        ais = ais_factory(mmsi=444, lon=-74.0, lat=40.7, sog=0.5, n_hours=1)
+        result = matcher.match(ais)
+        assert list(result.columns) == ["mmsi", "portName"]
+        assert result.to_dict("records") == [{"mmsi": 444, "portName": "NewYorkPort"}]
+
+    def test_zero_min_time_keeps_visit_order(self, ports_gdf, ais_factory):
+        ais = pd.concat([
+            ais_factory(mmsi=111, lon=-118.2, lat=33.7, sog=0.5),
+            ais_factory(mmsi=5, lon=-74.0, lat=40.7, sog=0.5),
+        ])
+        shortcut = PortMatcher(ports_gdf, radius_nm=10, max_speed_knots=1.5, min_time_in_port=0)
+        filtered = PortMatcher(ports_gdf, radius_nm=10, max_speed_knots=1.5, min_time_in_port=0.0001)
+        pd.testing.assert_frame_equal(shortcut.match(ais), filtered.match(ais))
+
+    def test_result_is_deduplicated(self, matcher, ais_factory):
+        ais = ais_factory(mmsi=555, lon=-74.0, lat=40.7, sog=0.5, n_hours=10)
         result = matcher.match(ais)
         assert len(result) == 1
 
-    def test_multiple_vessels_at_different_ports(self, matcher):
-        ais1 = _ais_df(mmsi=100, lon=-74.0, lat=40.7, sog=0.5)     # NewYorkPort
-        ais2 = _ais_df(mmsi=200, lon=-118.2, lat=33.7, sog=0.5)    # LosAngelesPort
-        result = matcher.match(pd.concat([ais1, ais2], ignore_index=True))
+    def test_multiple_vessels_at_different_ports(self, matcher, two_vessel_ais):
+        result = matcher.match(two_vessel_ais)
 
         assert len(result) == 2
         assert set(result["portName"]) == {"NewYorkPort", "LosAngelesPort"}
 
-    def test_empty_ais_returns_empty(self, matcher):
-        ais = pd.DataFrame(
-            columns=["mmsi", "longitude", "latitude", "sog", "base_date_time"]
-        )
-        result = matcher.match(ais)
-        assert len(result) == 0
+
+# ---------------------------------------------------------------------------
+# Exclusion rules shared by match() and find_port_visits()
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("method_name", ["match", "find_port_visits"])
+class TestExclusion:
+    @pytest.mark.parametrize("ais_fixture", ["fast_ais", "outside_radius_ais", "empty_ais"])
+    def test_excluded_pings_produce_no_results(self, matcher, method_name, ais_fixture, request):
+        ais = request.getfixturevalue(ais_fixture)
+        assert len(getattr(matcher, method_name)(ais)) == 0
 
 
 # ---------------------------------------------------------------------------
@@ -101,58 +83,164 @@ class TestMatch:
 # ---------------------------------------------------------------------------
 
 class TestFindPortVisits:
-    def test_returns_expected_columns(self, matcher):
-        ais = _ais_df(mmsi=111, lon=-74.0, lat=40.7, sog=0.5)
+    def test_returns_expected_columns(self, matcher, ais_factory):
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5)
         result = matcher.find_port_visits(ais)
         assert set(result.columns) >= {"mmsi", "portName", "entry_time", "exit_time", "duration_hours"}
 
-    def test_visit_entry_exit_and_duration_are_correct(self, matcher):
-        ais = _ais_df(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=5)
+    def test_visit_entry_exit_and_duration_are_correct(self, matcher, ais_factory, base_time):
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=5)
         result = matcher.find_port_visits(ais)
         row = result.iloc[0]
-        assert row["entry_time"] == pd.Timestamp(BASE_TIME)
-        assert row["exit_time"]  == pd.Timestamp(BASE_TIME + timedelta(hours=4))
+        assert row["entry_time"] == base_time
+        assert row["exit_time"]  == base_time + timedelta(hours=4)
         assert row["duration_hours"] == pytest.approx(4.0)
 
-    def test_single_ping_has_zero_duration(self, matcher):
-        ais = _ais_df(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=1)
+    def test_single_ping_has_zero_duration(self, matcher, ais_factory):
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=1)
         result = matcher.find_port_visits(ais)
         assert result.iloc[0]["duration_hours"] == pytest.approx(0.0)
 
-    def test_gap_larger_than_threshold_splits_into_two_visits(self, matcher):
-        block1 = _ais_df(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=3)
-        block2 = _ais_df(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=3)
-        block2["base_date_time"] = block2["base_date_time"] + timedelta(hours=48)
-        ais = pd.concat([block1, block2], ignore_index=True)
-        result = matcher.find_port_visits(ais, gap_threshold_h=24)
+    def test_gap_larger_than_threshold_splits_into_two_visits(self, matcher, gap_ais):
+        result = matcher.find_port_visits(gap_ais(48), gap_threshold_h=24)
         assert len(result) == 2
 
-    def test_gap_smaller_than_threshold_stays_one_visit(self, matcher):
-        block1 = _ais_df(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=3)
-        block2 = _ais_df(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=3)
-        block2["base_date_time"] = block2["base_date_time"] + timedelta(hours=5)
-        ais = pd.concat([block1, block2], ignore_index=True)
-        result = matcher.find_port_visits(ais, gap_threshold_h=24)
+    def test_gap_smaller_than_threshold_stays_one_visit(self, matcher, gap_ais):
+        result = matcher.find_port_visits(gap_ais(5), gap_threshold_h=24)
         assert len(result) == 1
 
-    def test_fast_vessel_produces_no_visits(self, matcher):
-        ais = _ais_df(mmsi=222, lon=-74.0, lat=40.7, sog=5.0)
-        assert len(matcher.find_port_visits(ais)) == 0
+    def test_visits_computed_per_mmsi_and_port(self, matcher, two_vessel_ais):
+        result = matcher.find_port_visits(two_vessel_ais)
+        assert len(result) == 2
+        assert set(result["portName"]) == {"NewYorkPort", "LosAngelesPort"}
 
-    def test_vessel_outside_radius_produces_no_visits(self, matcher):
-        ais = _ais_df(mmsi=333, lon=-76.0, lat=40.7, sog=0.5)
-        assert len(matcher.find_port_visits(ais)) == 0
+    def test_arrow_backed_input_gives_same_visits(self, matcher, ais_factory):
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=5)
+        result = matcher.find_port_visits(ais.convert_dtypes(dtype_backend="pyarrow"))
+        assert len(result) == 1
+        assert result.iloc[0]["portName"] == "NewYorkPort"
+        assert result.iloc[0]["duration_hours"] == pytest.approx(4.0)
 
-    def test_empty_ais_returns_empty(self, matcher):
-        ais = pd.DataFrame(columns=["mmsi", "longitude", "latitude", "sog", "base_date_time"])
+    def test_visit_times_keep_input_timestamp_dtype(self, matcher, ais_factory):
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5)
+        ais["base_date_time"] = ais["base_date_time"].dt.tz_localize("UTC").dt.as_unit("us")
+        result = matcher.find_port_visits(ais)
+        assert result["entry_time"].dtype == ais["base_date_time"].dtype
+        assert result["exit_time"].dtype == ais["base_date_time"].dtype
+        assert result.iloc[0]["exit_time"] == ais["base_date_time"].iloc[-1]
+
+    def test_parallel_matching_gives_same_visits(self, matcher, two_vessel_ais):
+        expected = matcher.find_port_visits(two_vessel_ais)
+        result = matcher.find_port_visits(two_vessel_ais, n_jobs=4)
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_ping_within_two_port_radii_matches_both(self, ais_factory):
+        # Two ports ~4 nm apart; a vessel between them is inside both radii.
+        ports = gpd.GeoDataFrame(
+            {"portName": ["PortA", "PortB"], "geometry": [Point(-74.0, 40.7), Point(-74.0, 40.766)]},
+            crs="EPSG:4326",
+        )
+        matcher = PortMatcher(ports, radius_nm=10, max_speed_knots=1.5)
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.733, sog=0.5)
+        result = matcher.find_port_visits(ais)
+        assert set(result["portName"]) == {"PortA", "PortB"}
+
+    def test_pings_without_timestamp_are_ignored(self, matcher, ais_factory):
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=4)
+        ais.loc[0, "base_date_time"] = pd.NaT
+        result = matcher.find_port_visits(ais)
+        assert len(result) == 1
+        assert result.iloc[0]["entry_time"] == ais.loc[1, "base_date_time"]
+        assert result.iloc[0]["exit_time"] == ais.loc[3, "base_date_time"]
+        assert result.iloc[0]["duration_hours"] == pytest.approx(2.0)
+        assert matcher.match(ais).to_dict("records") == [{"mmsi": 111, "portName": "NewYorkPort"}]
+
+    def test_pings_without_position_are_ignored(self, matcher, ais_factory):
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5)
+        ais.loc[0, "latitude"] = float("nan")
+        ais.loc[1, "longitude"] = float("nan")
+        result = matcher.find_port_visits(ais)
+        assert len(result) == 1
+        assert result.iloc[0]["entry_time"] == result.iloc[0]["exit_time"] == ais.loc[2, "base_date_time"]
+
+    def test_polygon_ports_are_matched_on_buffered_geometry(self, ports_gdf, ais_factory):
+        polygons = ports_gdf.to_crs("EPSG:3857")
+        polygons["geometry"] = polygons.geometry.buffer(1000)
+        matcher = PortMatcher(polygons.to_crs("EPSG:4326"), radius_nm=10, max_speed_knots=1.5)
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5)
+        result = matcher.find_port_visits(ais)
+        assert len(result) == 1
+        assert result.iloc[0]["portName"] == "NewYorkPort"
+
+    def test_point_port_radius_ignores_polygon_ports(self, ports_gdf, ais_factory):
+        # 9 nm north of NewYorkPort: inside the 10 nm great-circle radius.
+        north_sea = gpd.GeoDataFrame(
+            {"portName": ["NorthSeaPort"], "geometry": [Point(10.0, 55.0).buffer(0.01)]},
+            crs="EPSG:4326",
+        )
+        mixed = pd.concat([ports_gdf, north_sea], ignore_index=True)
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7 + 9 / 60, sog=0.5)
+        for ports in (ports_gdf, mixed):
+            result = PortMatcher(ports, radius_nm=10, max_speed_knots=1.5).find_port_visits(ais)
+            assert list(result["portName"]) == ["NewYorkPort"]
+
+    def test_empty_port_table_matches_nothing(self, ports_gdf, ais_factory):
+        matcher = PortMatcher(ports_gdf.iloc[:0], radius_nm=10, max_speed_knots=1.5)
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5)
         assert len(matcher.find_port_visits(ais)) == 0
+        assert len(matcher.match(ais)) == 0
 
-    def test_visits_computed_per_mmsi_and_port(self, matcher):
-        ais1 = _ais_df(mmsi=111, lon=-74.0,   lat=40.7, sog=0.5)   # NewYorkPort
-        ais2 = _ais_df(mmsi=222, lon=-118.2,  lat=33.7, sog=0.5)   # LosAngelesPort
-        result = matcher.find_port_visits(pd.concat([ais1, ais2], ignore_index=True))
-        assert len(result) == 2
-        assert set(result["portName"]) == {"NewYorkPort", "LosAngelesPort"}
+
+# ---------------------------------------------------------------------------
+# match_parquet()
+# ---------------------------------------------------------------------------
+
+class TestMatchParquet:
+    @pytest.fixture
+    def parquet_path(self, tmp_path, ais_factory):
+        at_port  = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5)    # NewYorkPort
+        far_away = ais_factory(mmsi=222, lon=10.0,  lat=55.0, sog=0.5)    # North Sea
+        path = tmp_path / "ais.parquet"
+        pd.concat([at_port, far_away], ignore_index=True).to_parquet(path, row_group_size=len(at_port))
+        return path
+
+    def test_matches_like_in_memory(self, matcher, parquet_path):
+        result = matcher.match_parquet(parquet_path)
+        assert result.to_dict("records") == [{"mmsi": 111, "portName": "NewYorkPort"}]
+
+    def test_row_groups_outside_port_bounds_are_not_read(self, matcher, parquet_path, monkeypatch):
+        read = []
+        original = pq.ParquetFile.read_row_groups
+
+        def spy(self, row_groups, *args, **kwargs):
+            read.extend(row_groups)
+            return original(self, row_groups, *args, **kwargs)
+
+        monkeypatch.setattr(pq.ParquetFile, "read_row_groups", spy)
+        matcher.match_parquet(parquet_path)
+        assert read == [0]
+
+
+# ---------------------------------------------------------------------------
+# match_iter()
+# ---------------------------------------------------------------------------
+
+class TestMatchIter:
+    def test_stay_split_across_chunks_is_one_visit(self, ports_gdf, ais_factory):
+        matcher = PortMatcher(ports_gdf, radius_nm=10, max_speed_knots=1.5, min_time_in_port=3)
+        # 4 hourly pings (3 h stay) split 2 + 2 over two chunks; each half alone is only 1 h
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=4)
+        result = matcher.match_iter([ais.iloc[:2], ais.iloc[2:]])
+        assert result.to_dict("records") == [{"mmsi": 111, "portName": "NewYorkPort"}]
+
+    def test_reads_csv_path_in_chunks(self, matcher, two_vessel_ais, tmp_path):
+        path = tmp_path / "ais.csv"
+        two_vessel_ais.to_csv(path, index=False)
+        result = matcher.match_iter(path, chunksize=2)
+        pd.testing.assert_frame_equal(result, matcher.match(two_vessel_ais))
+
+    def test_no_chunks_returns_empty(self, matcher):
+        assert len(matcher.match_iter([])) == 0
 
 
 # ---------------------------------------------------------------------------
@@ -160,6 +248,11 @@ class TestFindPortVisits:
 # ---------------------------------------------------------------------------
 
 class TestAddPortCallCounts:
+    @pytest.fixture
+    def matcher(self, ports_gdf):
+        """add_port_call_counts() rebinds matcher.ports, so each test gets its own instance."""
+        return PortMatcher(ports_gdf, radius_nm=10, max_speed_knots=1.5, min_time_in_port=1)
+
     def test_counts_unique_vessels_per_port(self, matcher):
         matched = pd.DataFrame(
             {
@@ -169,10 +262,9 @@ class TestAddPortCallCounts:
         )
         result = matcher.add_port_call_counts(matched)
 
-        ny = result.loc[result["portName"] == "NewYorkPort", "port_call_count"].iloc[0]
-        la = result.loc[result["portName"] == "LosAngelesPort", "port_call_count"].iloc[0]
-        assert ny == 3
-        assert la == 1
+        counts = result.set_index("portName")["port_call_count"]
+        assert counts["NewYorkPort"] == 3
+        assert counts["LosAngelesPort"] == 1
 
     def test_port_with_no_visits_gets_zero(self, matcher):
         matched = pd.DataFrame(
@@ -180,8 +272,8 @@ class TestAddPortCallCounts:
         )
         result = matcher.add_port_call_counts(matched)
 
-        la = result.loc[result["portName"] == "LosAngelesPort", "port_call_count"].iloc[0]
-        assert la == 0
+        counts = result.set_index("portName")["port_call_count"]
+        assert counts["LosAngelesPort"] == 0
 
     def test_same_vessel_visiting_port_multiple_times_counts_once(self, matcher):
         matched = pd.DataFrame(
@@ -189,8 +281,9 @@ class TestAddPortCallCounts:
         )
         result = matcher.add_port_call_counts(matched)
 
-        ny = result.loc[result["portName"] == "NewYorkPort", "port_call_count"].iloc[0]
-        assert ny == 1
+        counts = result.set_index("portName")["port_call_count"]
+        assert counts["NewYorkPort"] == 1
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
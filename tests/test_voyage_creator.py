@@ -1,115 +1,65 @@
 """Tests for VoyageCreator."""
 import pytest
+import numpy as np
 import pandas as pd
-import geopandas as gpd
-from datetime import datetime, timedelta
-from shapely.geometry import Point
+from datetime import timedelta
 
 from src.voyage_creator import VoyageCreator
 
-BASE_TIME = datetime(2025, 1, 1, 0, 0, 0)
-
 
 # ---------------------------------------------------------------------------
-# Fixtures & helpers
+# Fixtures
 # ---------------------------------------------------------------------------
 
-@pytest.fixture
-def ports_gdf():
-    """Two ports: one near New York, one near Los Angeles."""
-    return gpd.GeoDataFrame(
-        {
-            "portName": ["NewYorkPort", "LosAngelesPort"],
-            "geometry": [Point(-74.0, 40.7), Point(-118.2, 33.7)],
-        },
-        crs="EPSG:4326",
-    )
-
-
-@pytest.fixture
+@pytest.fixture(scope="module")
 def creator(ports_gdf):
     return VoyageCreator(ports_gdf, radius_nm=10, max_speed_knots=1.5, gap_threshold_h=24)
 
 
-def _ais_pings(mmsi, lon, lat, sog, start_time=BASE_TIME, n_hours=3):
-    """Create n_hours hourly AIS pings for one vessel at a fixed position."""
-    timestamps = [start_time + timedelta(hours=i) for i in range(n_hours)]
-    return pd.DataFrame({
-        "mmsi": mmsi,
-        "longitude": lon,
-        "latitude": lat,
-        "sog": sog,
-        "base_date_time": timestamps,
-    })
-
-
 # ---------------------------------------------------------------------------
 # find_port_visits()
 # ---------------------------------------------------------------------------
 
 class TestFindPortVisits:
-    def test_returns_expected_columns(self, creator):
-        ais = _ais_pings(mmsi=111, lon=-74.0, lat=40.7, sog=0.5)
+    def test_returns_expected_columns(self, creator, ais_factory):
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5)
         result = creator.find_port_visits(ais)
         assert set(result.columns) >= {"mmsi", "portName", "entry_time", "exit_time", "duration_hours"}
 
-    def test_vessel_at_port_creates_one_visit(self, creator):
-        ais = _ais_pings(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=4)
+    def test_vessel_at_port_creates_one_visit(self, creator, ais_factory):
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=4)
         result = creator.find_port_visits(ais)
         assert len(result) == 1
         assert result.iloc[0]["mmsi"] == 111
         assert result.iloc[0]["portName"] == "NewYorkPort"
 
-    def test_visit_entry_exit_times_are_correct(self, creator):
-        ais = _ais_pings(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=5)
+    def test_visit_entry_exit_times_are_correct(self, creator, ais_factory, base_time):
+        ais = ais_factory(mmsi=111, lon=-74.0, lat=40.7, sog=0.5, n_hours=5)
         result = creator.find_port_visits(ais)
         row = result.iloc[0]
-        assert row["entry_time"] == pd.Timestamp(BASE_TIME)
-        assert row["exit_time"] == pd.Timestamp(BASE_TIME + timedelta(hours=4))
+        assert row["entry_time"] == base_time
+        assert row["exit_time"] == base_time + timedelta(hours=4)
         assert row["duration_hours"] == pytest.approx(4.0)
 
-    def test_fast_vessel_produces_no_visits(self, creator):
-        ais = _ais_pings(mmsi=222, lon=-74.0, lat=40.7, sog=5.0)
-        result = creator.find_port_visits(ais)
-        assert len(result) == 0
+    @pytest.mark.parametrize("ais_fixture", ["fast_ais", "outside_radius_ais", "empty_ais"])
+    def test_excluded_pings_produce_no_visits(self, creator, ais_fixture, request):
+        ais = request.getfixturevalue(ais_fixture)
+        assert len(creator.find_port_visits(ais)) == 0
 
-    def test_vessel_outside_radius_produces_no_visits(self, creator):
-        # ~170 km west of NewYorkPort — well outside 10 nm radius
-        ais = _ais_pings(mmsi=333, lon=-76.0, lat=40.7, sog=0.5)
-        result = creator.find_port_visits(ais)
-        assert len(result) == 0
-
-    def test_gap_larger_than_threshold_splits_into_two_visits(self, creator):
-        block1 = _ais_pings(mmsi=111, lon=-74.0, lat=40.7, sog=0.5,
-                             start_time=BASE_TIME, n_hours=3)
-        block2 = _ais_pings(mmsi=111, lon=-74.0, lat=40.7, sog=0.5,
-                             start_time=BASE_TIME + timedelta(hours=48), n_hours=3)
-        ais = pd.concat([block1, block2], ignore_index=True)
-        result = creator.find_port_visits(ais)
+    def test_gap_larger_than_threshold_splits_into_two_visits(self, creator, gap_ais):
+        result = creator.find_port_visits(gap_ais(48))
         assert len(result) == 2
         assert (result["portName"] == "NewYorkPort").all()
 
-    def test_gap_smaller_than_threshold_stays_one_visit(self, creator):
-        block1 = _ais_pings(mmsi=111, lon=-74.0, lat=40.7, sog=0.5,
-                             start_time=BASE_TIME, n_hours=3)
-        block2 = _ais_pings(mmsi=111, lon=-74.0, lat=40.7, sog=0.5,
-                             start_time=BASE_TIME + timedelta(hours=5), n_hours=3)
-        ais = pd.concat([block1, block2], ignore_index=True)
-        result = creator.find_port_visits(ais)
+    def test_gap_smaller_than_threshold_stays_one_visit(self, creator, gap_ais):
+        result = creator.find_port_visits(gap_ais(5))
         assert len(result) == 1
 
-    def test_multiple_vessels_at_different_ports(self, creator):
-        ais1 = _ais_pings(mmsi=100, lon=-74.0, lat=40.7, sog=0.5)    # NewYorkPort
-        ais2 = _ais_pings(mmsi=200, lon=-118.2, lat=33.7, sog=0.5)   # LosAngelesPort
-        result = creator.find_port_visits(pd.concat([ais1, ais2], ignore_index=True))
+    def test_multiple_vessels_at_different_ports(self, creator, two_vessel_ais):
+        result = creator.find_port_visits(two_vessel_ais)
         assert len(result) == 2
         assert set(result["portName"]) == {"NewYorkPort", "LosAngelesPort"}
 
-    def test_empty_ais_returns_empty(self, creator):
-        ais = pd.DataFrame(columns=["mmsi", "longitude", "latitude", "sog", "base_date_time"])
-        result = creator.find_port_visits(ais)
-        assert len(result) == 0
-
 
 # ---------------------------------------------------------------------------
 # label_pings()
@@ -120,9 +70,9 @@ class TestLabelPings:
     # Pings t=0..2 at NY, t=3..5 at sea, t=6..8 at LA
     # Visits: NY (entry=t0, exit=t2), LA (entry=t6, exit=t8)
 
-    @pytest.fixture
-    def scenario(self):
-        t = [BASE_TIME + timedelta(hours=i) for i in range(9)]
+    @pytest.fixture(scope="module")
+    def scenario(self, base_time):
+        t = [base_time + timedelta(hours=i) for i in range(9)]
         ais = pd.DataFrame({
             "mmsi": 111,
             "longitude": [-74.0] * 3 + [-100.0] * 3 + [-118.2] * 3,
@@ -145,18 +95,18 @@ class TestLabelPings:
         for col in ("current_port", "origin_port", "destination_port", "voyage_id"):
             assert col in result.columns
 
-    def test_ping_in_port_window_gets_current_port(self, scenario):
+    def test_ping_in_port_window_gets_current_port(self, scenario, base_time):
         ais, visits = scenario
         result = VoyageCreator.label_pings(ais, visits)
-        ny_pings = result[result["base_date_time"] <= BASE_TIME + timedelta(hours=2)]
+        ny_pings = result[result["base_date_time"] <= base_time + timedelta(hours=2)]
         assert ny_pings["current_port"].eq("NewYorkPort").all()
 
-    def test_sea_ping_has_no_current_port(self, scenario):
+    def test_sea_ping_has_no_current_port(self, scenario, base_time):
         ais, visits = scenario
         result = VoyageCreator.label_pings(ais, visits)
         sea_pings = result[
-            (result["base_date_time"] > BASE_TIME + timedelta(hours=2)) &
-            (result["base_date_time"] < BASE_TIME + timedelta(hours=6))
+            (result["base_date_time"] > base_time + timedelta(hours=2)) &
+            (result["base_date_time"] < base_time + timedelta(hours=6))
         ]
         assert sea_pings["current_port"].isna().all()
 
@@ -184,6 +134,13 @@ class TestLabelPings:
         result = VoyageCreator.label_pings(ais, visits)
         assert result["voyage_id"].isna().all()
 
+    def test_input_frame_is_not_modified(self, scenario):
+        ais, visits = scenario
+        ais_str = ais.assign(base_date_time=ais["base_date_time"].astype(str))
+        before = ais_str.copy()
+        VoyageCreator.label_pings(ais_str, visits)
+        pd.testing.assert_frame_equal(ais_str, before)
+
 
 # ---------------------------------------------------------------------------
 # build_voyages()
@@ -195,9 +152,9 @@ class TestBuildVoyages:
     # Sea pings: t6, t7, t8, t9
     # LA visit: entry=t10, exit=t15
 
-    @pytest.fixture
-    def voyage_scenario(self):
-        t = lambda h: BASE_TIME + timedelta(hours=h)
+    @pytest.fixture(scope="module")
+    def voyage_scenario(self, base_time):
+        t = lambda h: base_time + timedelta(hours=h)
         visits = pd.DataFrame({
             "mmsi":           [111,        111],
             "portName":       ["NewYorkPort", "LosAngelesPort"],
@@ -207,16 +164,19 @@ class TestBuildVoyages:
         })
         sea_times  = [t(h) for h in (6, 7, 8, 9)]
         port_times = [t(h) for h in (0, 1, 2, 3, 4, 5, 10, 11, 12)]
-        all_times  = sorted(sea_times + port_times)
+        all_ts     = pd.to_datetime(sea_times + port_times).as_unit("ns").sort_values()
+        ts_ns      = all_ts.asi8
         labeled = pd.DataFrame({
             "mmsi": 111,
-            "base_date_time": all_times,
-            "current_port": [
-                "NewYorkPort"    if t(0) <= ts <= t(5)  else
-                "LosAngelesPort" if ts >= t(10)         else
-                None
-                for ts in all_times
-            ],
+            "base_date_time": all_ts,
+            "current_port": np.select(
+                [
+                    (ts_ns >= pd.Timestamp(t(0)).value) & (ts_ns <= pd.Timestamp(t(5)).value),
+                    ts_ns >= pd.Timestamp(t(10)).value,
+                ],
+                ["NewYorkPort", "LosAngelesPort"],
+                default=None,
+            ),
             "origin_port": None,
             "destination_port": None,
             "voyage_id": pd.NA,
@@ -243,9 +203,9 @@ class TestBuildVoyages:
         assert voyage["departure_port"] == "NewYorkPort"
         assert voyage["arrival_port"]   == "LosAngelesPort"
 
-    def test_voyage_has_correct_times_and_duration(self, voyage_scenario):
+    def test_voyage_has_correct_times_and_duration(self, voyage_scenario, base_time):
         labeled, visits = voyage_scenario
-        t = lambda h: BASE_TIME + timedelta(hours=h)
+        t = lambda h: base_time + timedelta(hours=h)
         _, df_voyages = VoyageCreator.build_voyages(labeled, visits)
         voyage = df_voyages.iloc[0]
         assert voyage["departure_time"] == t(5)
@@ -257,9 +217,9 @@ class TestBuildVoyages:
         _, df_voyages = VoyageCreator.build_voyages(labeled, visits)
         assert df_voyages.iloc[0]["ping_count"] == 4  # t=6,7,8,9
 
-    def test_sea_pings_get_voyage_id(self, voyage_scenario):
+    def test_sea_pings_get_voyage_id(self, voyage_scenario, base_time):
         labeled, visits = voyage_scenario
-        t = lambda h: BASE_TIME + timedelta(hours=h)
+        t = lambda h: base_time + timedelta(hours=h)
         df_labeled, df_voyages = VoyageCreator.build_voyages(labeled, visits)
         sea_pings = df_labeled[
             (df_labeled["base_date_time"] > t(5)) &
@@ -274,8 +234,25 @@ class TestBuildVoyages:
         port_pings = df_labeled[df_labeled["current_port"].notna()]
         assert port_pings["voyage_id"].isna().all()
 
-    def test_single_visit_produces_no_voyages(self):
-        t = lambda h: BASE_TIME + timedelta(hours=h)
+    def test_input_frames_are_not_modified(self, voyage_scenario):
+        labeled, visits = voyage_scenario
+        before = labeled.copy(), visits.copy()
+        VoyageCreator.build_voyages(labeled, visits)
+        pd.testing.assert_frame_equal(labeled, before[0])
+        pd.testing.assert_frame_equal(visits, before[1])
+
+    def test_voyage_times_keep_visit_timestamp_dtype(self, voyage_scenario):
+        labeled, visits = voyage_scenario
+        to_utc = lambda col: col.dt.tz_localize("UTC")
+        visits = visits.assign(entry_time=to_utc(visits["entry_time"]), exit_time=to_utc(visits["exit_time"]))
+        labeled = labeled.assign(base_date_time=to_utc(labeled["base_date_time"]))
+        _, df_voyages = VoyageCreator.build_voyages(labeled, visits)
+        assert df_voyages["departure_time"].dtype == visits["exit_time"].dtype
+        assert df_voyages["arrival_time"].dtype == visits["entry_time"].dtype
+        assert df_voyages.iloc[0]["departure_time"] == visits["exit_time"].iloc[0]
+
+    def test_single_visit_produces_no_voyages(self, base_time):
+        t = lambda h: base_time + timedelta(hours=h)
         visits = pd.DataFrame({
             "mmsi":           [111],
             "portName":       ["NewYorkPort"],
@@ -294,9 +271,9 @@ class TestBuildVoyages:
         _, df_voyages = VoyageCreator.build_voyages(labeled, visits)
         assert len(df_voyages) == 0
 
-    def test_overlapping_visits_are_skipped(self):
+    def test_overlapping_visits_are_skipped(self, base_time):
         """Visit B's entry_time <= visit A's exit_time → no valid voyage."""
-        t = lambda h: BASE_TIME + timedelta(hours=h)
+        t = lambda h: base_time + timedelta(hours=h)
         visits = pd.DataFrame({
             "mmsi":           [111,    111],
             "portName":       ["PortA", "PortB"],
@@ -315,9 +292,9 @@ class TestBuildVoyages:
         _, df_voyages = VoyageCreator.build_voyages(labeled, visits)
         assert len(df_voyages) == 0
 
-    def test_multiple_vessels_get_independent_voyages(self):
+    def test_multiple_vessels_get_independent_voyages(self, base_time):
         """Two vessels each with two port visits → two voyages, one per vessel."""
-        t = lambda h: BASE_TIME + timedelta(hours=h)
+        t = lambda h: base_time + timedelta(hours=h)
         visits = pd.DataFrame({
             "mmsi":           [111,    111,    222,    222],
             "portName":       ["PortA", "PortB", "PortC", "PortD"],
@@ -338,5 +315,39 @@ class TestBuildVoyages:
         assert set(df_voyages["mmsi"]) == {111, 222}
 
 
+# ---------------------------------------------------------------------------
+# find_port_visits() → label_pings() → build_voyages()
+# ---------------------------------------------------------------------------
+
+class TestPipeline:
+    # Pings t=0..2 at NY, t=3..5 at sea, t=6..8 at LA, timestamps as strings
+    # the way they arrive from CSV or the Kafka stream.
+
+    @pytest.fixture(scope="module")
+    def string_ais(self, base_time):
+        t = pd.date_range(base_time, periods=9, freq="h")
+        return pd.DataFrame({
+            "mmsi": 111,
+            "longitude": [-74.0] * 3 + [-100.0] * 3 + [-118.2] * 3,
+            "latitude":  [40.7]  * 3 + [35.0]   * 3 + [33.7]   * 3,
+            "sog": [0.5] * 3 + [10.0] * 3 + [0.5] * 3,
+            "base_date_time": t.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+
+    def test_string_timestamps_run_end_to_end(self, creator, string_ais):
+        visits = creator.find_port_visits(string_ais)
+        labeled = VoyageCreator.label_pings(string_ais, visits)
+        assert visits["entry_time"].dtype == labeled["base_date_time"].dtype
+
+        df_labeled, df_voyages = VoyageCreator.build_voyages(labeled, visits)
+        assert len(df_voyages) == 1
+        assert df_voyages.iloc[0]["departure_port"] == "NewYorkPort"
+        assert df_voyages.iloc[0]["arrival_port"] == "LosAngelesPort"
+        assert df_voyages.iloc[0]["ping_count"] == 3
+        assert df_labeled["voyage_id"].notna().sum() == 3
+        assert df_voyages["departure_time"].dtype == visits["exit_time"].dtype
+        assert df_voyages["arrival_time"].dtype == visits["entry_time"].dtype
+
+
 if __name__ == "__main__":
-    pytest.main([__file__, "-v"])
\ No newline at end of file
+    pytest.main([__file__, "-v"])